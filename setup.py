@@ -14,13 +14,15 @@ setuptools.setup(
     classifiers=[],
     python_requires=">=3.6",
     install_requires=[
-        "pandas",
+        "numpy",
+        "pyarrow",
         "filetype",
+        "httpx[http2]",
         "streamlit-ace",
         "streamlit-molstar >= 0.4.6",
         "streamlit-antd",
         "streamlit-embeded",
-        "streamlit >= 0.63",
+        "streamlit >= 1.18",
         "pymatgen",
         "supabase",
     ],
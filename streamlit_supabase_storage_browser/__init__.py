@@ -1,25 +1,30 @@
 import contextlib
-import copy
-import fnmatch
+import functools
+import io
 import os
 import os.path
+import re
 import urllib
 from datetime import datetime
-from html import escape
 from pathlib import Path
-from typing import Optional, TypedDict
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional, TypedDict
 from urllib.parse import urljoin
 
-import numpy as np
-import requests
 import streamlit as st
 import streamlit.components.v1 as components
 from filetype import audio_match, image_match, video_match
 from storage3.utils import SyncClient
-from streamlit_ace import st_ace
-from streamlit_embeded import st_embeded
+
+if TYPE_CHECKING:
+    import httpx
 
 CACHE_FILE_NAME = ".st-tree.cache"
+PREVIEW_MAX_BYTES = 1024 * 1024
+COMPONENT_FILES_LIMIT = 10000
+FILETYPE_HEADER_BYTES = 261
+# Recursive glob patterns that select everything, as glob.glob(..., recursive=True) does
+MATCH_ALL_PATTERNS = frozenset(("*", "**", "**/*"))
 
 parent_dir = os.path.dirname(os.path.abspath(__file__))
 build_dir = os.path.join(parent_dir, "frontend/build")
@@ -49,7 +54,7 @@ class Bucket:
         self.__bucket_id = bucket_id
         self.__path = path
 
-        self.__extensions = extensions or ()
+        self.__extensions = tuple(extensions or ())
 
     @property
     def public_url(self) -> str:
@@ -61,14 +66,49 @@ class Bucket:
         *,
         limit: Optional[int] = None,
         offset: Optional[int] = None,
+        order_by: Optional[dict] = None,
+        use_cache: bool = False,
+    ) -> tuple[File]:
+        if use_cache:
+            return _cached_list(
+                self,
+                self._auth_identity,
+                self.__supabase.storage_url,
+                self.__bucket_id,
+                self.__path,
+                self.__extensions,
+                tuple(glob_patterns),
+                limit,
+                offset,
+                order_by,
+            )
+        return self._list(glob_patterns, limit=limit, offset=offset, order_by=order_by)
+
+    @property
+    def _auth_identity(self) -> str:
+        # Row-level security makes listings depend on the caller's JWT
+        return self.__supabase.options.headers.get('Authorization') or self.__supabase.supabase_key
+
+    def exists(self, path: Path) -> bool:
+        return bool(self._query().eq('name', path).maybe_single().execute())
+
+    def _list(
+        self,
+        glob_patterns: tuple[str],
+        *,
+        limit: Optional[int] = None,
+        offset: Optional[int] = None,
         order_by: Optional[dict] = None
     ) -> tuple[File]:
-        def filter_func(file: File) -> bool:
-            # TODO: Move to DB level
-            return any(fnmatch.fnmatch(file['path'], pattern) for pattern in glob_patterns)
+        if not glob_patterns:
+            return ()
 
         query = self._query()
 
+        glob_filter = _glob_filter(tuple(glob_patterns))
+        if glob_filter:
+            query = query.or_(glob_filter)
+
         if limit is not None:
             query = query.limit(limit)
         if offset is not None:
@@ -77,12 +117,8 @@ class Bucket:
             query = query.order_by(**order_by)
 
         raw_files = query.execute().data
-        files = map(translate_storage_file, raw_files)
-
-        return tuple(filter(filter_func, files))
 
-    def exists(self, path: Path) -> bool:
-        return bool(self._query().eq('name', path).maybe_single().execute())
+        return tuple(translate_storage_files(raw_files))
 
     def _query(self):
         bucket = (
@@ -93,7 +129,7 @@ class Bucket:
         if self.__path is not None:
             bucket = bucket.like('name', f'{self.__path}%')
         if self.__extensions:
-            bucket = bucket.like_any_of('name', f'{",".join([f"%{extension}" for extension in self.__extensions])}')
+            bucket = bucket.like_any_of('name', ",".join(f"%{extension}" for extension in self.__extensions))
 
         return bucket
 
@@ -101,25 +137,233 @@ class Bucket:
         return self.__supabase.schema('storage').table('objects')
 
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _cached_list(
+    _bucket: Bucket,
+    auth_identity: str,
+    storage_url: str,
+    bucket_id: str,
+    path: Optional[Path],
+    extensions: tuple[str],
+    glob_patterns: tuple[str],
+    limit: Optional[int],
+    offset: Optional[int],
+    order_by: Optional[dict],
+) -> tuple[File]:
+    # Everything but the bucket itself is part of the cache key
+    return _bucket._list(glob_patterns, limit=limit, offset=offset, order_by=order_by)
+
+
+def _quote_filter_value(value: str) -> str:
+    # PostgREST logic trees reserve `,().:`, so values are always double-quoted
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def _fnmatch_to_like(pattern: str) -> str:
+    like = []
+    for char in pattern:
+        if char == '*':
+            if not like or like[-1] != '%':
+                like.append('%')
+        elif char == '?':
+            like.append('_')
+        elif char in '%_\\':
+            like.append(f'\\{char}')
+        else:
+            like.append(char)
+    return ''.join(like)
+
+
+def _fnmatch_to_regex(pattern: str) -> str:
+    i, n = 0, len(pattern)
+    regex = []
+    while i < n:
+        char = pattern[i]
+        i += 1
+        if char == '*':
+            if not regex or regex[-1] != '.*':
+                regex.append('.*')
+        elif char == '?':
+            regex.append('.')
+        elif char == '[':
+            j = i
+            if j < n and pattern[j] == '!':
+                j += 1
+            if j < n and pattern[j] == ']':
+                j += 1
+            j = pattern.find(']', j)
+            if j == -1:
+                regex.append('\\[')
+                continue
+            chars = pattern[i:j].replace('\\', '\\\\')
+            i = j + 1
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            elif chars.startswith('^'):
+                chars = '\\' + chars
+            regex.append(f'[{chars}]')
+        else:
+            regex.append(re.escape(char))
+    return f'(?:^{"".join(regex)}$)'
+
+
+@functools.lru_cache(maxsize=64)
+def _glob_filter(glob_patterns: tuple[str]) -> Optional[str]:
+    """Translate fnmatch patterns into a PostgREST ``or`` filter on the object name.
+
+    Returns ``None`` when a pattern matches every file. Literal names become a
+    single ``IN`` list and wildcards map onto ``LIKE``; character classes have
+    no ``LIKE`` equivalent, so those patterns are joined into a single POSIX
+    regex (``~``) that Postgres compiles once and matches in one pass per row.
+    """
+    if any(pattern in MATCH_ALL_PATTERNS for pattern in glob_patterns):
+        return None
+
+    literals, wildcards, regexes = [], [], []
+    for pattern in glob_patterns:
+        if '[' in pattern:
+            regexes.append(_fnmatch_to_regex(pattern))
+        elif '*' in pattern or '?' in pattern:
+            wildcards.append(_fnmatch_to_like(pattern))
+        else:
+            literals.append(pattern)
+
+    conditions = [f'name.like.{_quote_filter_value(like)}' for like in wildcards]
+    if literals:
+        conditions.append(f'name.in.({",".join(map(_quote_filter_value, literals))})')
+    if regexes:
+        conditions.append(f'name.match.{_quote_filter_value("|".join(regexes))}')
+    return ','.join(conditions)
+
+
+def _parse_timestamp(value: Optional[str]) -> float:
+    if not value:
+        return 0
+    # fromisoformat only accepts a trailing `Z` from Python 3.11 on
+    if value.endswith('Z'):
+        value = f'{value[:-1]}+00:00'
+    return datetime.fromisoformat(value).timestamp()
+
+
 def translate_storage_file(storage_file: dict) -> File:
     return File(
         path=storage_file['name'],
         size=storage_file['size'],
-        access_time=datetime.fromisoformat(storage_file['last_accessed_at']).timestamp() / 1000,
-        create_time=datetime.fromisoformat(storage_file['created_at']).timestamp() / 1000,
-        update_time=datetime.fromisoformat(storage_file['updated_at']).timestamp() / 1000,
+        access_time=_parse_timestamp(storage_file['last_accessed_at']),
+        create_time=_parse_timestamp(storage_file['created_at']),
+        update_time=_parse_timestamp(storage_file['updated_at']),
     )
 
 
+def _parse_timestamps(values: list[Optional[str]]) -> list[float]:
+    import numpy as np
+
+    naive = []
+    for value in values:
+        if not value:
+            naive.append('NaT')
+        elif value.endswith('Z'):
+            naive.append(value[:-1])
+        elif value.endswith('+00:00'):
+            naive.append(value[:-6])
+        else:
+            # NumPy can't parse offsets without a deprecation warning
+            return [_parse_timestamp(value) for value in values]
+
+    timestamps = np.asarray(naive, dtype='datetime64[us]')
+    seconds = timestamps.astype(np.int64) / 1_000_000
+    return np.where(np.isnat(timestamps), 0, seconds).tolist()
+
+
+def translate_storage_files(storage_files: list[dict]) -> list[File]:
+    access_times = _parse_timestamps([storage_file['last_accessed_at'] for storage_file in storage_files])
+    create_times = _parse_timestamps([storage_file['created_at'] for storage_file in storage_files])
+    update_times = _parse_timestamps([storage_file['updated_at'] for storage_file in storage_files])
+
+    return [
+        File(
+            path=storage_file['name'],
+            size=storage_file['size'],
+            access_time=access_time,
+            create_time=create_time,
+            update_time=update_time,
+        )
+        for storage_file, access_time, create_time, update_time
+        in zip(storage_files, access_times, create_times, update_times)
+    ]
+
+
+@st.cache_resource
+def _http() -> "httpx.Client":
+    import httpx
+
+    # Shared across sessions so previews reuse pooled HTTP/2 connections
+    return httpx.Client(http2=True, timeout=10.0, follow_redirects=True)
+
+
+def _get(url: str) -> "httpx.Response":
+    # Raising keeps error bodies out of st.cache_data
+    response = _http().get(url)
+    response.raise_for_status()
+    return response
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _fetch_bytes(url: str) -> bytes:
+    return _get(url).content
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _fetch_text(url: str) -> str:
+    return _get(url).text
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _fetch_json(url: str):
+    return _get(url).json()
+
+
+@st.cache_data(ttl=300, max_entries=64, show_spinner=False)
+def _fetch_preview_bytes(url: str, max_bytes: int = PREVIEW_MAX_BYTES) -> bytes:
+    # Servers may ignore Range, so the streamed read is capped as well
+    content = bytearray()
+    with _http().stream('GET', url, headers={'Range': f'bytes=0-{max_bytes - 1}'}) as response:
+        # Ranged reads of zero-byte objects are unsatisfiable
+        if response.status_code == 416:
+            return b''
+        response.raise_for_status()
+        for chunk in response.iter_bytes():
+            content += chunk
+            if len(content) >= max_bytes:
+                break
+    return bytes(content[:max_bytes])
+
+
+def _fetch_preview_text(url: str, max_bytes: int = PREVIEW_MAX_BYTES) -> str:
+    return _fetch_preview_bytes(url, max_bytes).decode(errors='replace')
+
+
+def _fetch_preview_lines(url: str, max_bytes: int = PREVIEW_MAX_BYTES) -> bytes:
+    return _trim_partial_row(_fetch_preview_bytes(url, max_bytes), max_bytes)
+
+
+def _trim_partial_row(content: bytes, max_bytes: int) -> bytes:
+    if len(content) < max_bytes:
+        return content
+    # Drop the trailing partial row of a truncated read, unless it is the only one
+    end = content.rfind(b'\n')
+    return content if end == -1 else content[:end + 1]
+
+
 def _do_code_preview(url, **kwargs):
-    content = requests.get(url).text
+    content = _fetch_preview_text(url)
     st.code(content, **kwargs)
 
 
-def _do_pdf_preview(url, height="420px", **kwargs):
-    safe_url = escape(url)
-    pdf_display = f'<iframe src="{safe_url}" width="100%" min-height="240px" height="{height} type="application/pdf"></iframe>'
-    st.markdown(pdf_display, unsafe_allow_html=True)
+def _do_pdf_preview(url, height=420, **kwargs):
+    if isinstance(height, str):
+        height = int(height.removesuffix("px"))
+    components.iframe(url, height=height)
 
 
 # def _do_molecule_preview(root, file_path, url, **kwargs):
@@ -144,49 +388,50 @@ def _do_pdf_preview(url, height="420px", **kwargs):
 #     return True
 
 
-def _do_csv_preview(url, **kwargs):
-    import pandas as pd
+def _do_table_preview(url, delimiter, **kwargs):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pv
 
-    content = requests.get(url).text
+    content = _fetch_preview_lines(url)
 
-    df = pd.read_csv(content)
-    mask = df.applymap(type) != bool
-    d = {True: "True", False: "False"}
-    df = df.where(mask, df.replace(d))
-    df = df.replace(np.nan, None)
-    st.dataframe(df, **kwargs)
+    table = pv.read_csv(io.BytesIO(content), parse_options=pv.ParseOptions(delimiter=delimiter))
+    for i, field in enumerate(table.schema):
+        if pa.types.is_boolean(field.type):
+            # if_else keeps nulls as nulls
+            table = table.set_column(i, field.name, pc.if_else(table.column(i), "True", "False"))
+    st.dataframe(table, **kwargs)
 
 
-def _do_tsv_preview(url, **kwargs):
-    import pandas as pd
+def _do_csv_preview(url, **kwargs):
+    _do_table_preview(url, delimiter=",", **kwargs)
 
-    content = requests.get(url).text
 
-    df = pd.read_table(content)
-    mask = df.applymap(type) != bool
-    d = {True: "True", False: "False"}
-    df = df.where(mask, df.replace(d))
-    df = df.replace(np.nan, None)
-    st.dataframe(df, **kwargs)
+def _do_tsv_preview(url, **kwargs):
+    _do_table_preview(url, delimiter="\t", **kwargs)
 
 
 def _do_json_preview(url, **kwargs):
-    content = requests.get(url).json()
+    content = _fetch_json(url)
     st.json(content, **kwargs)
 
 
 def _do_html_preview(url, **kwargs):
-    html = requests.get(url).text
+    from streamlit_embeded import st_embeded
+
+    html = _fetch_text(url)
     st_embeded(html, **kwargs)
 
 
 def _do_markdown_preview(url, **kwargs):
-    md = requests.get(url).text
+    md = _fetch_text(url)
     st.markdown(md, unsafe_allow_html=True)
 
 
 def _do_plain_preview(url, **kwargs):
-    plain = requests.get(url).content
+    from streamlit_ace import st_ace
+
+    plain = _fetch_preview_text(url)
     key = f'{kwargs.get("key", url)}-preview'
     st_ace(value=plain, readonly=True, show_gutter=False, key=key)
 
@@ -194,7 +439,7 @@ def _do_plain_preview(url, **kwargs):
 # RNA Secondary Structure Formats
 # DB (dot bracket) format (.db, .dbn) is a plain text format that can encode secondory structure.
 def _do_dbn_preview(url, **kwargs):
-    content = requests.get(url).text
+    content = _fetch_text(url)
     encoding = urllib.parse.urlencode(
         {"id": "fasta", "file": content}, safe=r"()[]{}>#"
     )
@@ -203,8 +448,9 @@ def _do_dbn_preview(url, **kwargs):
     components.iframe(url, height=600)
 
 
-PREVIEW_HANDLERS = {
-    extention: handler
+# Keyed by lowercase extension; show_file_preview lowercases before lookup
+PREVIEW_HANDLERS = MappingProxyType({
+    extention.lower(): handler
     for extentions, handler in [
         # (
         #     (
@@ -232,14 +478,14 @@ PREVIEW_HANDLERS = {
         ((".pdf",), _do_pdf_preview),
         ((".csv",), _do_csv_preview),
         ((".tsv",), _do_tsv_preview),
-        ((".log", ".txt", ".md", ".upf", ".UPF", ".orb"), _do_plain_preview),
+        ((".log", ".txt", ".md", ".upf", ".orb"), _do_plain_preview),
         ((".md",), _do_markdown_preview),
         ((".py", ".sh"), _do_code_preview),
         ((".html", ".htm"), _do_html_preview),
         ((".dbn",), _do_dbn_preview),
     ]
     for extention in extentions
-}
+})
 
 
 def show_file_preview(
@@ -254,27 +500,30 @@ def show_file_preview(
 
     with preview:
         url = urljoin(artifacts_site, target_path) if artifacts_site else None
-        ext = os.path.splitext(target_path)[1]
-        handles = copy.copy(PREVIEW_HANDLERS)
-        handles.update(overide_preview_handles or {})
-        if ext in handles:
-            try:
-                handler = handles[ext]
-                handler(url, **kwargs)
-            except Exception as e:
-                st.error(f"failed preview {target_path}")
-                st.exception(e)
+        ext = os.path.splitext(target_path)[1].lower()
+        if overide_preview_handles:
+            handles = {**PREVIEW_HANDLERS, **{e.lower(): h for e, h in overide_preview_handles.items()}}
         else:
-            content = requests.get(url).content
-
-            if image_match(content):
-                st.image(content, **kwargs)
-            elif ft := video_match(content):
-                st.video(url, format=ft.mime, **kwargs)
-            elif ft := audio_match(content):
-                st.audio(content, format=ft.mime, **kwargs)
+            handles = PREVIEW_HANDLERS
+        handler = handles.get(ext)
+        try:
+            if handler is not None:
+                handler(url, **kwargs)
             else:
-                st.info(f"No preview available for {ext}")
+                # filetype only inspects the leading magic bytes
+                header = _fetch_preview_bytes(url, FILETYPE_HEADER_BYTES)
+
+                if image_match(header):
+                    st.image(_fetch_bytes(url), **kwargs)
+                elif ft := video_match(header):
+                    st.video(url, format=ft.mime, **kwargs)
+                elif ft := audio_match(header):
+                    st.audio(url, format=ft.mime, **kwargs)
+                else:
+                    st.info(f"No preview available for {ext}")
+        except Exception as e:
+            st.error(f"failed preview {target_path}")
+            st.exception(e)
 
     # if raw:
     #     with raw:
@@ -313,10 +562,17 @@ def st_supabase_storage_browser(
 ):
     bucket = Bucket(supabase, bucket_id, path, extensions=extentions)
 
+    # The component payload is JSON, so the database bounds how many rows cross the bridge
+    limit = COMPONENT_FILES_LIMIT if limit is None else min(limit, COMPONENT_FILES_LIMIT)
+
     files = bucket.list(glob_patterns,
                         limit=limit,
                         offset=offset,
-                        order_by=sort)
+                        order_by=sort,
+                        use_cache=use_cache)
+
+    if len(files) == COMPONENT_FILES_LIMIT:
+        st.warning(f"Only the first {COMPONENT_FILES_LIMIT} files are shown")
 
     if show_preview and show_preview_top:
         preview = st.container()
@@ -324,7 +580,7 @@ def st_supabase_storage_browser(
         preview = contextlib.nullcontext()
 
     event = _component_func(
-        files=files,
+        files={column: [file[column] for file in files] for column in File.__annotations__},
         show_choose_file=show_choose_file,
         show_choose_folder=show_choose_folder,
         show_download_file=show_download_file,
@@ -346,7 +602,7 @@ def st_supabase_storage_browser(
     ):
         file = event["target"]
 
-        if not bucket.exists(file['path']):
+        if file['path'] not in {f['path'] for f in files}:
             st.warning(f"File {file['path']} not found")
             return event
 
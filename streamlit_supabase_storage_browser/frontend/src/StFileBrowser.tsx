@@ -28,6 +28,15 @@ interface File {
   access_time?: number
 }
 
+// Files arrive column-wise from Python to avoid repeating keys per row
+interface FileColumns {
+  path: string[]
+  size: number[]
+  create_time: number[]
+  update_time: number[]
+  access_time: number[]
+}
+
 interface Folder {
   path: string
   name?: string
@@ -76,6 +85,20 @@ interface IArgs {
   static_file_server_path: string
 }
 
+const unpackFiles = (columns: FileColumns): File[] => {
+  const files: File[] = new Array(columns.path.length)
+  for (let i = 0; i < columns.path.length; i++) {
+    files[i] = {
+      path: columns.path[i],
+      size: columns.size[i],
+      create_time: columns.create_time[i],
+      update_time: columns.update_time[i],
+      access_time: columns.access_time[i],
+    }
+  }
+  return files
+}
+
 const noticeStreamlit = (event: StreamlitEvent | StreamlitEvent[]) =>
   Streamlit.setComponentValue(event)
 
@@ -184,7 +207,7 @@ class FileBrowserNative extends StreamlitComponentBase<State> {
 
   constructor(props: ComponentProps) {
     super(props)
-    this.args = props.args
+    this.args = { ...props.args, files: unpackFiles(props.args.files) }
   }
 
   ajustHeight(revoke_step?: number) {
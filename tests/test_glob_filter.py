@@ -0,0 +1,49 @@
+from streamlit_supabase_storage_browser import (
+    _fnmatch_to_like,
+    _fnmatch_to_regex,
+    _glob_filter,
+    _quote_filter_value,
+)
+
+
+def test_like_translates_wildcards():
+    assert _fnmatch_to_like('*/**') == '%/%'
+    assert _fnmatch_to_like('file?.txt') == 'file_.txt'
+
+
+def test_like_escapes_like_metacharacters():
+    assert _fnmatch_to_like('a%b_c\\d') == 'a\\%b\\_c\\\\d'
+
+
+def test_regex_translates_classes():
+    assert _fnmatch_to_regex('img[0-9].png') == '(?:^img[0-9]\\.png$)'
+    assert _fnmatch_to_regex('x[!ab]?') == '(?:^x[^ab].$)'
+    assert _fnmatch_to_regex('x[]a]') == '(?:^x[]a]$)'
+    assert _fnmatch_to_regex('x[!]a]') == '(?:^x[^]a]$)'
+
+
+def test_regex_treats_unterminated_class_as_literal():
+    assert _fnmatch_to_regex('a[b') == '(?:^a\\[b$)'
+
+
+def test_quote_filter_value_escapes_quotes_and_backslashes():
+    assert _quote_filter_value('a,b') == '"a,b"'
+    assert _quote_filter_value('say "hi"') == '"say \\"hi\\""'
+    assert _quote_filter_value('a\\b') == '"a\\\\b"'
+
+
+def test_glob_filter_match_all():
+    assert _glob_filter(('**/*',)) is None
+    assert _glob_filter(('*.csv', '*')) is None
+
+
+def test_glob_filter_combines_conditions():
+    assert _glob_filter(('*.csv', 'x,y.txt', 'a[0-9]', 'b[!c]')) == (
+        'name.like."%.csv",'
+        'name.in.("x,y.txt"),'
+        'name.match."(?:^a[0-9]$)|(?:^b[^c]$)"'
+    )
+
+
+def test_glob_filter_quotes_like_escapes():
+    assert _glob_filter(('a_"*',)) == 'name.like."a\\\\_\\"%"'
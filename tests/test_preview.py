@@ -0,0 +1,13 @@
+from streamlit_supabase_storage_browser import _trim_partial_row
+
+
+def test_short_read_is_unchanged():
+    assert _trim_partial_row(b'a,b\n1,2', 16) == b'a,b\n1,2'
+
+
+def test_truncated_read_is_cut_to_last_newline():
+    assert _trim_partial_row(b'a,b\n1,2\n3,', 10) == b'a,b\n1,2\n'
+
+
+def test_truncated_read_without_newline_is_kept():
+    assert _trim_partial_row(b'abcdefgh', 8) == b'abcdefgh'
@@ -0,0 +1,48 @@
+from streamlit_supabase_storage_browser import _parse_timestamp, _parse_timestamps, translate_storage_file
+
+
+def test_parse_timestamp_z_suffix():
+    assert _parse_timestamp('2023-01-01T00:00:00Z') == 1672531200
+
+
+def test_parse_timestamp_utc_offset():
+    assert _parse_timestamp('2023-01-01T00:00:00.5+00:00') == 1672531200.5
+
+
+def test_parse_timestamp_none():
+    assert _parse_timestamp(None) == 0
+
+
+def test_translate_storage_file_uses_epoch_seconds():
+    file = translate_storage_file({
+        'name': 'docs/readme.md',
+        'size': 42,
+        'created_at': '2023-01-01T00:00:00+00:00',
+        'updated_at': '2023-01-02T00:00:00Z',
+        'last_accessed_at': None,
+    })
+
+    assert file == {
+        'path': 'docs/readme.md',
+        'size': 42,
+        'create_time': 1672531200,
+        'update_time': 1672617600,
+        'access_time': 0,
+    }
+
+
+def test_parse_timestamps_matches_per_row_parser():
+    values = ['2023-01-01T00:00:00Z', '2023-01-01T00:00:00.123456+00:00', None, '']
+
+    assert _parse_timestamps(values) == [_parse_timestamp(value) for value in values]
+
+
+def test_parse_timestamps_falls_back_for_other_offsets():
+    values = ['2023-01-01T00:00:00Z', '2023-01-01T02:00:00+02:00', None]
+
+    assert _parse_timestamps(values) == [_parse_timestamp(value) for value in values]
+    assert _parse_timestamps(values)[1] == 1672531200
+
+
+def test_parse_timestamps_empty():
+    assert _parse_timestamps([]) == []